@@ -23,14 +23,20 @@ The endpoints:
 
 import os
 import time
+import asyncio
 import hashlib
+import json
 import tempfile
 import logging
 import re
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import List, Optional
 
+import numpy as np
+
 from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -119,6 +125,7 @@ class QueryRequest(BaseModel):
     k: Optional[int] = 3
     score_threshold: Optional[float] = 0.6
     filter: Optional[QueryFilter] = None
+    stream: Optional[bool] = False
 
 
 class SourceItem(BaseModel):
@@ -140,16 +147,131 @@ class QueryResponse(BaseModel):
 # ============================================================
 # REGEX PATTERNS FOR DATA ANONYMIZATION
 # ============================================================
-EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
-PHONE_RE = re.compile(r"\b(\+?\d[\d\-\s]{6,}\d)\b")
-CREDIT_CARD_RE = re.compile(r"\b(?:\d[ -]*?){13,16}\b")
-US_ZIP_RE = re.compile(r"\b\d{5}(?:-\d{4})?\b")
-ADDRESS_EN_RE = re.compile(
-    r"\d{1,5}\s+[A-Za-z0-9.\-]+\s+(Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct)\b",
+# All patterns are combined into one alternation so anonymization walks the
+# text once instead of once per pattern. Each alternative is a named group;
+# the matched group name doubles as the redaction token.
+_ANON_PATTERNS = [
+    ("EMAIL", r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+    ("PHONE", r"\b\+?\d[\d\-\s]{6,}\d\b"),
+    ("CARD", r"\b(?:\d[ -]*?){13,16}\b"),
+    ("ZIP", r"\b\d{5}(?:-\d{4})?\b"),
+    ("ADDRESS", r"\d{1,5}\s+[A-Za-z0-9.\-]+\s+"
+                r"(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr|Court|Ct)\b"),
+]
+ANON_RE = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in _ANON_PATTERNS),
     re.I
 )
 
 
+# Every PII pattern above requires an '@' or a digit somewhere in the match,
+# so this single-character-class scan acts as a prefilter: text without any
+# such byte can skip the full alternation entirely.
+_ANON_PREFILTER_RE = re.compile(r"[@0-9]")
+
+
+def _anon_repl(match: re.Match) -> str:
+    """Map a combined-pattern match to its redaction token, e.g. '[EMAIL]'."""
+    return f"[{match.lastgroup}]"
+
+
+# Number of chunks embedded and upserted per flush during ingestion; keeps
+# peak memory bounded instead of materializing all embeddings at once.
+# Tunable so the flush size can be aligned with the HNSW segment size of
+# the target Chroma deployment.
+UPSERT_FLUSH_SIZE = int(os.getenv("CHROMA_UPSERT_BATCH_SIZE", "512"))
+
+# Size of the read buffer when spooling an upload to a temp file; uploads are
+# streamed to disk in pieces of this size rather than read fully into RAM.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Static instruction header for the LLM prompt; built once at import time so
+# each request only concatenates the per-query context and question.
+PROMPT_HEADER = (
+    "You are an assistant for question-answering. "
+    "Use the retrieved context to answer concisely (<= 3 sentences). "
+    "If the answer is not in the context, say 'I don't know'.\n\n"
+)
+
+
+# ============================================================
+# SEMANTIC ANSWER CACHE
+# ============================================================
+# Near-duplicate questions (embedding cosine similarity above the threshold)
+# reuse a previous LLM answer instead of paying for another Ollama call.
+# Embeddings are already L2-normalized, so similarity is a plain dot product.
+# Entries expire after a TTL, and the whole cache is invalidated whenever an
+# ingest changes the corpus, so stale pre-ingest answers are never replayed.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "600"))
+
+# FIFO list of (question_embedding, answer, ts) triples
+_semantic_cache: List[tuple] = []
+
+
+def semantic_cache_lookup(q_emb) -> Optional[str]:
+    """Return a cached answer whose question embedding is close enough to q_emb."""
+    # Evict expired entries first; the list is small (bounded FIFO)
+    now = time.time()
+    _semantic_cache[:] = [
+        entry for entry in _semantic_cache if now - entry[2] < SEMANTIC_CACHE_TTL_SECONDS
+    ]
+    if not _semantic_cache:
+        return None
+    cached_embs = np.stack([emb for emb, _, _ in _semantic_cache])
+    sims = cached_embs @ np.asarray(q_emb, dtype=np.float32)
+    best = int(np.argmax(sims))
+    if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+        return _semantic_cache[best][1]
+    return None
+
+
+def semantic_cache_store(q_emb, answer: str) -> None:
+    """Remember an LLM answer for the given question embedding (bounded FIFO)."""
+    if len(_semantic_cache) >= SEMANTIC_CACHE_MAX_ENTRIES:
+        _semantic_cache.pop(0)
+    _semantic_cache.append((np.asarray(q_emb, dtype=np.float32), answer, time.time()))
+
+
+def semantic_cache_clear() -> None:
+    """Drop all cached answers; called when ingestion changes the corpus."""
+    _semantic_cache.clear()
+
+
+# ============================================================
+# EXACT PROMPT CACHE
+# ============================================================
+# The LLM prompt is fully determined by the question plus the retrieved chunk
+# IDs, so an identical (question, retrieved_ids) pair can reuse its previous
+# answer verbatim. Checked before the semantic cache since it is exact.
+PROMPT_CACHE_MAX_ENTRIES = 512
+
+# LRU mapping of prompt key -> answer
+_prompt_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def prompt_cache_key(question: str, chunk_ids: List[str]) -> str:
+    """Hash the question together with the sorted retrieved chunk IDs."""
+    base = question + "|" + ",".join(sorted(chunk_ids))
+    return hashlib.blake2b(base.encode(), digest_size=20).hexdigest()
+
+
+def prompt_cache_lookup(key: str) -> Optional[str]:
+    """Return the cached answer for this prompt key, refreshing its LRU slot."""
+    answer = _prompt_cache.get(key)
+    if answer is not None:
+        _prompt_cache.move_to_end(key)
+    return answer
+
+
+def prompt_cache_store(key: str, answer: str) -> None:
+    """Remember an LLM answer under its prompt key, evicting the oldest entry."""
+    _prompt_cache[key] = answer
+    _prompt_cache.move_to_end(key)
+    if len(_prompt_cache) > PROMPT_CACHE_MAX_ENTRIES:
+        _prompt_cache.popitem(last=False)
+
+
 # ============================================================
 # UTILITY FUNCTIONS
 # ============================================================
@@ -157,12 +279,18 @@ ADDRESS_EN_RE = re.compile(
 def make_chunk_id(source: str, page_number: Optional[int], idx: int) -> str:
     """Generate a unique, reproducible hash ID for a text chunk."""
     base = f"{source or 'unknown'}|{page_number or 0}|{idx}|{time.time()}"
+    # sha1 is the fastest stdlib option for these short inputs (OpenSSL
+    # backed, typically SHA-NI accelerated); the ID is a uniqueness token,
+    # not security material.
     return hashlib.sha1(base.encode()).hexdigest()
 
 
 def approx_token_count(text: str) -> int:
-    """Roughly estimate token count by whitespace splitting."""
-    return max(1, len(text.split()))
+    """Roughly estimate token count by counting whitespace separators."""
+    # str.count runs at memchr speed without materializing a word list the
+    # way split() does; the estimate is approximate by design, so runs of
+    # whitespace slightly overcounting is an acceptable trade.
+    return max(1, text.count(" ") + text.count("\n") + 1)
 
 
 def anonymize_text(text: str) -> str:
@@ -173,24 +301,87 @@ def anonymize_text(text: str) -> str:
     if not text:
         return text
 
-    t = EMAIL_RE.sub("[EMAIL]", text)
-    t = PHONE_RE.sub("[PHONE]", t)
-    t = CREDIT_CARD_RE.sub("[CARD]", t)
-    t = US_ZIP_RE.sub("[ZIP]", t)
-    t = ADDRESS_EN_RE.sub("[ADDRESS]", t)
+    # Prefilter with a trivial character-class scan; most clean chunks bail
+    # out here without paying for the full combined pattern.
+    if _ANON_PREFILTER_RE.search(text):
+        t = ANON_RE.sub(_anon_repl, text)
+    else:
+        t = text
 
     if nlp:
         try:
             doc = nlp(t)
-            for ent in sorted(doc.ents, key=lambda e: e.start_char, reverse=True):
+            # doc.ents is already ordered and non-overlapping, so the
+            # redacted string can be assembled in one forward pass instead
+            # of re-splicing the full text for every entity
+            parts = []
+            last = 0
+            for ent in doc.ents:
                 if ent.label_ in {"PERSON", "ORG", "GPE", "LOC", "FAC"}:
-                    t = t[:ent.start_char] + f"[{ent.label_}]" + t[ent.end_char:]
+                    parts.append(t[last:ent.start_char])
+                    parts.append(f"[{ent.label_}]")
+                    last = ent.end_char
+            parts.append(t[last:])
+            t = "".join(parts)
         except Exception as e:
             logger.warning(f"spaCy anonymization failed: {e}")
 
     return t
 
 
+def _process_upload(filename: str, tmp_path: str):
+    """
+    Parse one staged upload into parallel (texts, ids, metadatas, tokens).
+
+    Runs on a worker thread so several files can be chunked concurrently;
+    the staged temp file is removed once parsing finishes.
+    """
+    texts, ids, metadatas = [], [], []
+    total_tokens = 0
+
+    try:
+        # Handle PDF ingestion
+        if filename.lower().endswith(".pdf"):
+            pdf_chunks = extract_text_from_pdf(tmp_path)
+
+            for i, chunk in enumerate(pdf_chunks):
+                chunk_id = chunk.get("id") or make_chunk_id(
+                    chunk["metadata"]["source"],
+                    chunk["metadata"]["page_number"],
+                    i
+                )
+                texts.append(chunk["content"])
+                ids.append(chunk_id)
+                metadatas.append({
+                    "source": chunk["metadata"]["source"],
+                    "page_number": chunk["metadata"]["page_number"],
+                    "chunk_id": chunk_id,
+                    "date_added": datetime.now(timezone.utc).isoformat()
+                })
+                total_tokens += approx_token_count(chunk["content"])
+
+        # Handle plain-text ingestion
+        else:
+            with open(tmp_path, "r", encoding="utf-8", errors="ignore") as text_file:
+                text = text_file.read()
+            chunks = split_text(text)
+            for i, chunk in enumerate(chunks):
+                chunk_id = make_chunk_id(filename, None, i)
+                texts.append(chunk)
+                ids.append(chunk_id)
+                metadatas.append({
+                    "source": filename,
+                    "page_number": None,
+                    "chunk_id": chunk_id,
+                    "date_added": datetime.now(timezone.utc).isoformat()
+                })
+                total_tokens += approx_token_count(chunk)
+    finally:
+        os.remove(tmp_path)
+
+    return texts, ids, metadatas, total_tokens
+
+
 # ============================================================
 # ENDPOINT: DOCUMENT INGESTION
 # ============================================================
@@ -215,79 +406,88 @@ async def ingest_endpoint(files: Optional[List[UploadFile]] = File(None)):
     collection = get_chroma_collection()
     ef = get_embedding_function()
 
+    # Stage 1: stream every upload to a temp file in fixed-size pieces
+    # instead of reading the whole body into memory at once. If any file
+    # fails mid-stream, every temp file staged so far is removed.
+    staged = []
+    filename = None
+    try:
+        for f in files:
+            filename = f.filename or "upload"
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf" if filename.lower().endswith(".pdf") else ".txt") as tmp_file:
+                # Register before streaming so the in-progress file is
+                # covered by the cleanup below
+                staged.append((filename, tmp_file.name))
+                while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+                    tmp_file.write(chunk)
+    except Exception as e:
+        for _, tmp_path in staged:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        logger.error(f"Failed processing {filename}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed processing {filename}: {e}")
+
+    # Stage 2: parse the staged files concurrently on worker threads; the
+    # per-file work (fitz parsing, chunking) releases the GIL often enough
+    # that multiple uploads overlap instead of queueing behind each other
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_process_upload, filename, tmp_path)
+          for filename, tmp_path in staged),
+        return_exceptions=True
+    )
+
     all_texts, all_ids, all_metadatas = [], [], []
     total_tokens = 0
-
-    for f in files:
-        filename = f.filename
-        content_bytes = await f.read()
+    seen_ids = set()
+
+    for (filename, _), result in zip(staged, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed processing {filename}: {result}")
+            raise HTTPException(status_code=500, detail=f"Failed processing {filename}: {result}")
+        texts, ids, metadatas, tokens = result
+        # Drop duplicate IDs within this upload batch (first occurrence
+        # wins); Chroma rejects batches containing the same ID twice
+        for text, chunk_id, meta in zip(texts, ids, metadatas):
+            if chunk_id in seen_ids:
+                continue
+            seen_ids.add(chunk_id)
+            all_texts.append(text)
+            all_ids.append(chunk_id)
+            all_metadatas.append(meta)
+        total_tokens += tokens
+
+    # Embed and persist in bounded batches: each flush embeds one slice and
+    # upserts it immediately, so a large upload never holds every embedding
+    # in memory at once.
+    vector_dim = None
+    for start in range(0, len(all_texts), UPSERT_FLUSH_SIZE):
+        batch_texts = all_texts[start:start + UPSERT_FLUSH_SIZE]
 
         try:
-            # Handle PDF ingestion
-            if filename.lower().endswith(".pdf"):
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                    tmp_file.write(content_bytes)
-                    tmp_path = tmp_file.name
-
-                pdf_chunks = extract_text_from_pdf(tmp_path)
-                os.remove(tmp_path)
-
-                for i, chunk in enumerate(pdf_chunks):
-                    chunk_id = chunk.get("id") or make_chunk_id(
-                        chunk["metadata"]["source"],
-                        chunk["metadata"]["page_number"],
-                        i
-                    )
-                    all_texts.append(chunk["content"])
-                    all_ids.append(chunk_id)
-                    all_metadatas.append({
-                        "source": chunk["metadata"]["source"],
-                        "page_number": chunk["metadata"]["page_number"],
-                        "chunk_id": chunk_id,
-                        "date_added": datetime.now(timezone.utc).isoformat()
-                    })
-                    total_tokens += approx_token_count(chunk["content"])
-
-            # Handle plain-text ingestion
-            else:
-                text = content_bytes.decode("utf-8", errors="ignore")
-                chunks = split_text(text)
-                for i, chunk in enumerate(chunks):
-                    chunk_id = make_chunk_id(filename, None, i)
-                    all_texts.append(chunk)
-                    all_ids.append(chunk_id)
-                    all_metadatas.append({
-                        "source": filename,
-                        "page_number": None,
-                        "chunk_id": chunk_id,
-                        "date_added": datetime.now(timezone.utc).isoformat()
-                    })
-                    total_tokens += approx_token_count(chunk)
-
+            embeddings = ef(batch_texts)
         except Exception as e:
-            logger.error(f"Failed processing {filename}: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed processing {filename}: {e}")
+            logger.error(f"Embedding generation failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Embedding generation failed: {e}")
 
-    # Generate embeddings for all text chunks
-    try:
-        embeddings = ef(all_texts)
-    except Exception as e:
-        logger.error(f"Embedding generation failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {e}")
+        if vector_dim is None and len(embeddings):
+            vector_dim = len(embeddings[0])
 
-    vector_dim = len(embeddings[0]) if embeddings else None
+        try:
+            collection.upsert(
+                ids=all_ids[start:start + UPSERT_FLUSH_SIZE],
+                documents=batch_texts,
+                embeddings=embeddings,
+                metadatas=all_metadatas[start:start + UPSERT_FLUSH_SIZE]
+            )
+        except Exception as e:
+            logger.error(f"Chroma upsert failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Chroma upsert failed: {e}")
 
-    # Persist embeddings and metadata into ChromaDB
-    try:
-        collection.upsert(
-            ids=all_ids,
-            documents=all_texts,
-            embeddings=embeddings,
-            metadatas=all_metadatas
-        )
-    except Exception as e:
-        logger.error(f"Chroma upsert failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Chroma upsert failed: {e}")
+    # The corpus changed, so previously cached answers may no longer reflect
+    # the best retrievable context
+    semantic_cache_clear()
 
     return IngestResponse(
         inserted_chunks=len(all_ids),
@@ -312,6 +512,9 @@ async def query_endpoint(req: QueryRequest):
       3. Optionally filter by metadata (source, page range).
       4. Send context + question to LLM for concise answering.
       5. Return both answer and supporting source snippets.
+
+    With stream=true the response is newline-delimited JSON: a sources line,
+    then answer deltas as the LLM generates them, then a done marker.
     """
     collection = get_chroma_collection()
     ef = get_embedding_function()
@@ -323,25 +526,36 @@ async def query_endpoint(req: QueryRequest):
         logger.error(f"Query embedding failed: {e}")
         raise HTTPException(status_code=500, detail=f"Query embedding failed: {e}")
 
-    # Step 2: Apply optional filters
+    # Step 2: Build optional metadata filter. The page range is pushed down
+    # into Chroma's where clause so filtering happens inside the index and
+    # the query no longer has to over-fetch for a Python-side post-filter.
     metadata_filter = None
     if req.filter:
+        conditions = []
         if req.filter.source:
-            metadata_filter = {"source": req.filter.source}
-        elif req.filter.min_page is not None and req.filter.min_page == req.filter.max_page:
-            metadata_filter = {"page_number": req.filter.min_page}
-
-    # Step 3: Query ChromaDB
+            conditions.append({"source": req.filter.source})
+        if req.filter.min_page is not None:
+            conditions.append({"page_number": {"$gte": req.filter.min_page}})
+        if req.filter.max_page is not None:
+            conditions.append({"page_number": {"$lte": req.filter.max_page}})
+        if len(conditions) == 1:
+            metadata_filter = conditions[0]
+        elif conditions:
+            metadata_filter = {"$and": conditions}
+
+    # Step 3: Query ChromaDB. If the filtered query fails, retry unfiltered
+    # and fall back to filtering pages in Python.
+    post_filter_pages = False
     try:
-        n_results = req.k * 3 if req.filter else req.k
         results = collection.query(
             query_embeddings=[q_emb],
-            n_results=n_results,
+            n_results=req.k,
             include=["documents", "distances", "metadatas"],
             where=metadata_filter
         )
     except Exception as e:
         logger.warning(f"Chroma query with filter failed: {e}, retrying without filter")
+        post_filter_pages = True
         try:
             results = collection.query(
                 query_embeddings=[q_emb],
@@ -352,51 +566,54 @@ async def query_endpoint(req: QueryRequest):
             logger.error(f"Chroma query failed: {e2}")
             raise HTTPException(status_code=500, detail=f"Chroma query failed: {e2}")
 
-    # Step 4: Post-process results
+    # Step 4: Post-process results with vectorized similarity math
     docs = results.get("documents", [[]])[0]
     distances = results.get("distances", [[]])[0]
     metadatas = results.get("metadatas", [[]])[0]
 
-    filtered_items = []
-    for doc, dist, meta in zip(docs, distances, metadatas):
-        try:
-            dist = float(dist)
-        except:
-            dist = 1.0
-        if req.filter:
+    try:
+        sims = 1.0 - np.asarray(distances, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Malformed distances degrade to similarity 0.0, as before
+        sims = np.array(
+            [1.0 - (float(d) if isinstance(d, (int, float)) else 1.0) for d in distances]
+        )
+
+    keep = np.ones(len(docs), dtype=bool)
+    if post_filter_pages and req.filter:
+        for i, meta in enumerate(metadatas):
             page = meta.get("page_number")
             if req.filter.min_page and page is not None and page < req.filter.min_page:
-                continue
-            if req.filter.max_page and page is not None and page > req.filter.max_page:
-                continue
-        filtered_items.append((doc, meta, 1.0 - dist))
-
-    # Apply similarity threshold
-    final_items = [item for item in filtered_items if item[2] >= (req.score_threshold or 0.0)]
-    if not final_items:
-        final_items = filtered_items[:req.k]
-
-    if not final_items:
+                keep[i] = False
+            elif req.filter.max_page and page is not None and page > req.filter.max_page:
+                keep[i] = False
+
+    # Apply similarity threshold as a mask over the kept candidates,
+    # falling back to the top-k kept results when nothing passes
+    kept_idx = np.flatnonzero(keep)
+    passing = kept_idx[sims[kept_idx] >= (req.score_threshold or 0.0)]
+    if passing.size == 0:
+        passing = kept_idx[:req.k]
+
+    if passing.size == 0:
+        if req.stream:
+            # Streaming clients always get the documented NDJSON shape,
+            # even when there is nothing to retrieve
+            def empty_stream():
+                yield json.dumps({"sources": []}) + "\n"
+                yield json.dumps({"delta": "No relevant context found."}) + "\n"
+                yield json.dumps({"done": True}) + "\n"
+
+            return StreamingResponse(empty_stream(), media_type="application/x-ndjson")
         return QueryResponse(answer="No relevant context found.", sources=[])
 
+    final_items = [(docs[i], metadatas[i], float(sims[i])) for i in passing]
+
     # Step 5: Build LLM prompt
     anonymized_context = "\n\n".join(anonymize_text(doc) for doc, _, _ in final_items)
-    prompt = (
-        "You are an assistant for question-answering. "
-        "Use the retrieved context to answer concisely (<= 3 sentences). "
-        "If the answer is not in the context, say 'I don't know'.\n\n"
-        f"Context:\n{anonymized_context}\n\nQuestion:\n{req.question}"
-    )
+    prompt = f"{PROMPT_HEADER}Context:\n{anonymized_context}\n\nQuestion:\n{req.question}"
 
-    # Step 6: Call Ollama LLM
-    try:
-        response = ollama_client.chat(model=OLLAMA_MODEL, messages=[{"role": "user", "content": prompt}])
-        answer_text = response["message"]["content"]
-    except Exception as e:
-        logger.error(f"Ollama call failed: {e}")
-        answer_text = f"LLM call failed: {e}"
-
-    # Step 7: Build final structured response
+    # Step 6: Build the structured sources (shared by both response modes)
     sources = [
         SourceItem(
             chunk_id=meta.get("chunk_id", "N/A"),
@@ -409,6 +626,75 @@ async def query_endpoint(req: QueryRequest):
         for doc, meta, sim in final_items
     ]
 
+    # Step 7: Resolve cached answers. The exact prompt cache (same question
+    # against the same retrieved chunks) is consulted first, then the
+    # semantic cache for near-duplicate questions.
+    cache_key = prompt_cache_key(
+        req.question, [meta.get("chunk_id", "") for _, meta, _ in final_items]
+    )
+    cached_answer = prompt_cache_lookup(cache_key)
+    if cached_answer is not None:
+        logger.info("Prompt cache hit, skipping LLM call")
+    elif req.filter is None:
+        # The semantic cache keys only on the question embedding, so it is
+        # bypassed for filtered queries: the same question under a different
+        # source/page filter legitimately has a different answer.
+        cached_answer = semantic_cache_lookup(q_emb)
+        if cached_answer is not None:
+            logger.info("Semantic cache hit, skipping LLM call")
+
+    # Step 8a: Streaming mode — send newline-delimited JSON: one sources
+    # line, then the answer as token deltas while Ollama generates them,
+    # then a done marker. This cuts time-to-first-byte from full generation
+    # latency to first-token latency.
+    if req.stream:
+        def event_stream():
+            yield json.dumps({"sources": [s.model_dump() for s in sources]}) + "\n"
+            if cached_answer is not None:
+                yield json.dumps({"delta": cached_answer}) + "\n"
+            else:
+                parts = []
+                try:
+                    for part in ollama_client.chat(
+                        model=OLLAMA_MODEL,
+                        messages=[{"role": "user", "content": prompt}],
+                        stream=True
+                    ):
+                        delta = part["message"]["content"]
+                        parts.append(delta)
+                        yield json.dumps({"delta": delta}) + "\n"
+                    answer = "".join(parts)
+                    prompt_cache_store(cache_key, answer)
+                    if req.filter is None:
+                        semantic_cache_store(q_emb, answer)
+                except Exception as e:
+                    logger.error(f"Ollama call failed: {e}")
+                    yield json.dumps({"error": f"LLM call failed: {e}"}) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+
+        return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+    # Step 8b: Non-streaming mode — call Ollama once and return the full
+    # structured response.
+    if cached_answer is not None:
+        answer_text = cached_answer
+    else:
+        try:
+            # The Ollama client is synchronous; run it on a worker thread so
+            # a multi-second generation does not block the event loop
+            response = await asyncio.to_thread(
+                ollama_client.chat,
+                model=OLLAMA_MODEL,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            answer_text = response["message"]["content"]
+            prompt_cache_store(cache_key, answer_text)
+            if req.filter is None:
+                semantic_cache_store(q_emb, answer_text)
+        except Exception as e:
+            logger.error(f"Ollama call failed: {e}")
+            answer_text = f"LLM call failed: {e}"
+
     return QueryResponse(answer=answer_text, sources=sources)
 
 
@@ -1,38 +1,34 @@
 import os
-import fitz
-import chromadb
-from chromadb.utils import embedding_functions
+import sys
+import importlib.util
 from datetime import datetime
 from typing import List, Dict
-from functools import lru_cache
-import time
-import hashlib
 
-
-@lru_cache(maxsize=1)
-def get_embedding_function():
-    return embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
-    )
-
-
-def get_chroma_collection(collection_name: str = "RAG_Test_files"):
-    chroma_client = chromadb.PersistentClient(path="chroma_VecDB")
-    ef = get_embedding_function()
-    return chroma_client.get_or_create_collection(
-        name=collection_name,
-        embedding_function=ef
+# The shared helpers live one directory up; make them importable when the
+# simple_RAG scripts are run standalone from this folder.
+_PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PARENT_DIR not in sys.path:
+    sys.path.append(_PARENT_DIR)
+
+from text_extraction import split_text, extract_text_from_pdf  # noqa: E402
+
+# This module occupies the name "utils" when the scripts here run, so the
+# backend's utils module is loaded under an explicit alias instead of a plain
+# import. Reusing its embedding and collection factories keeps both trees
+# writing compatible vectors (normalized embeddings, inner-product space)
+# into the shared Chroma store.
+if "_rag_backend_utils" in sys.modules:
+    _backend_utils = sys.modules["_rag_backend_utils"]
+else:
+    _spec = importlib.util.spec_from_file_location(
+        "_rag_backend_utils", os.path.join(_PARENT_DIR, "utils.py")
     )
+    _backend_utils = importlib.util.module_from_spec(_spec)
+    sys.modules["_rag_backend_utils"] = _backend_utils
+    _spec.loader.exec_module(_backend_utils)
 
-
-def split_text(text: str, chunk_size: int = 800, chunk_overlap: int = 20) -> List[str]:
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start = end - chunk_overlap
-    return chunks
+get_embedding_function = _backend_utils.get_embedding_function
+get_chroma_collection = _backend_utils.get_chroma_collection
 
 
 def load_documents_from_directory(directory_path: str) -> List[Dict[str, str]]:
@@ -66,31 +62,4 @@ def load_documents_from_directory(directory_path: str) -> List[Dict[str, str]]:
 
     return documents
 
-def extract_text_from_pdf(pdf_path):
-
-    doc = fitz.open(pdf_path)
-    all_chunks = []
-    source_name = os.path.basename(pdf_path)
-
-    for page_num, page in enumerate(doc, start=1):
-        text = page.get_text("text").strip()
-        if not text:
-            continue
-
-        # Split into smaller logical chunks
-        paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
-        for idx, chunk in enumerate(paragraphs):
-            chunk_id = hashlib.sha1(f"{source_name}-{page_num}-{idx}-{time.time()}".encode()).hexdigest()
-            all_chunks.append({
-                "id": chunk_id,
-                "content": chunk,
-                "metadata": {
-                    "source": source_name,
-                    "page_number": page_num,
-                    "chunk_index": idx,
-                    "date_added": time.strftime("%Y-%m-%d %H:%M:%S"),
-                },
-            })
-    return all_chunks
-
 
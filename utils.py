@@ -7,21 +7,128 @@ within a Retrieval-Augmented Generation (RAG) system.
 This module provides helper methods to:
 - Initialize and cache sentence embedding models.
 - Connect to and manage persistent ChromaDB collections.
-- Split text into overlapping chunks for better retrieval granularity.
-- Extract and structure text content from PDF files with metadata.
+
+Text splitting and PDF extraction are re-exported from the shared
+text_extraction module.
 
 All heavy or repeated operations (like embedding model loading) are optimized
 using caching mechanisms.
 """
 
 import os
-import fitz  # PyMuPDF for PDF text extraction
+import logging
 import chromadb
 from chromadb.utils import embedding_functions
 from typing import List
 from functools import lru_cache
-import time
-import hashlib
+
+# Text splitting and PDF extraction live in the shared module so the
+# simple_RAG scripts and this backend use one implementation.
+from text_extraction import split_text, extract_text_from_pdf
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxMiniLMEmbeddingFunction:
+    """
+    Chroma-compatible embedding function backed by an ONNX Runtime session.
+
+    Runs an exported (optionally int8-quantized) 'all-MiniLM-L6-v2' model on
+    CPU, which is substantially faster than FP32 PyTorch inference for bulk
+    ingestion. The model directory is produced with:
+
+        optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 onnx-minilm/
+
+    and optionally quantized with optimum.onnxruntime.ORTQuantizer (dynamic
+    int8). Token embeddings are mean-pooled and L2-normalized to match the
+    output of the sentence-transformers pipeline.
+    """
+
+    def __init__(self, model_dir: str, batch_size: int = 256):
+        import numpy as np
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self._np = np
+        self._batch_size = batch_size
+        self._tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self._session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        np = self._np
+        embeddings = []
+        for start in range(0, len(input), self._batch_size):
+            batch = input[start:start + self._batch_size]
+            encoded = self._tokenizer(
+                batch, padding=True, truncation=True, max_length=256, return_tensors="np"
+            )
+            feed = {k: v for k, v in encoded.items() if k in self._input_names}
+            token_embeddings = self._session.run(None, feed)[0]
+
+            # Mean-pool over real tokens, then L2-normalize
+            mask = encoded["attention_mask"][..., None].astype(token_embeddings.dtype)
+            summed = (token_embeddings * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled = summed / counts
+            norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings.extend((pooled / norms).tolist())
+        return embeddings
+
+
+class BatchedSentenceTransformerEmbeddingFunction(
+    embedding_functions.SentenceTransformerEmbeddingFunction
+):
+    """
+    Sentence transformer embedding function with a tunable encode batch size.
+
+    The stock Chroma wrapper leaves encode() at its default batch_size of 32,
+    which under-utilizes the model on bulk ingestion. This subclass calls
+    encode() directly with a larger batch size (EMBED_BATCH_SIZE environment
+    variable, default 128) and keeps embeddings L2-normalized.
+    """
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self._model.encode(
+            list(input),
+            batch_size=int(os.getenv("EMBED_BATCH_SIZE", "128")),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).tolist()
+
+
+def _default_embedding_device() -> str:
+    """
+    Picks the device for embedding inference.
+
+    The SENTENCE_TRANSFORMER_DEVICE environment variable takes precedence
+    (e.g. 'cuda', 'cuda:1', 'cpu'); otherwise CUDA is used when available.
+
+    Returns:
+        str: The torch device string to load the model on.
+    """
+    device = os.getenv("SENTENCE_TRANSFORMER_DEVICE")
+    if device:
+        return device
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+    except Exception:
+        pass
+    return "cpu"
 
 
 @lru_cache(maxsize=1)
@@ -30,26 +137,57 @@ def get_embedding_function():
     Returns a cached instance of a sentence transformer embedding function.
 
     Uses the 'all-MiniLM-L6-v2' model for efficient and compact text embeddings.
+    The model is placed on the GPU when one is available (override with the
+    SENTENCE_TRANSFORMER_DEVICE environment variable), and embeddings are
+    L2-normalized so cosine similarity reduces to a dot product downstream.
     Caching ensures the model is loaded only once during runtime, significantly
     improving performance in repeated calls.
 
+    Setting USE_ONNX_EMBEDDINGS=1 switches to an int8 ONNX Runtime model
+    (see OnnxMiniLMEmbeddingFunction) for faster CPU-only inference; the
+    exported model directory is taken from ONNX_MODEL_PATH (default
+    'onnx-minilm'). If the ONNX path cannot be loaded, the sentence
+    transformer model is used as a fallback.
+
     Returns:
-        embedding_functions.SentenceTransformerEmbeddingFunction:
-            The embedding function instance.
+        The embedding function instance.
     """
-    return embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
+    if os.getenv("USE_ONNX_EMBEDDINGS", "").lower() in ("1", "true", "yes"):
+        try:
+            return OnnxMiniLMEmbeddingFunction(
+                model_dir=os.getenv("ONNX_MODEL_PATH", "onnx-minilm")
+            )
+        except Exception as e:
+            # The ONNX path was explicitly requested, so degrading to the
+            # slower PyTorch model must not happen silently
+            logger.warning(
+                f"USE_ONNX_EMBEDDINGS is set but the ONNX model could not be "
+                f"loaded ({e}); falling back to the PyTorch model"
+            )
+    return BatchedSentenceTransformerEmbeddingFunction(
+        model_name="all-MiniLM-L6-v2",
+        device=_default_embedding_device(),
+        normalize_embeddings=True,
     )
 
 
+@lru_cache(maxsize=None)
 def get_chroma_collection(collection_name: str = "RAG_Test_files"):
     """
     Connects to (or creates) a ChromaDB persistent collection for storing embeddings.
 
+    The handle is cached per collection name, so repeated endpoint calls reuse
+    one PersistentClient instead of re-opening the store on every request.
+
     Args:
         collection_name (str, optional): The name of the Chroma collection to use.
                                          Defaults to 'RAG_Test_files'.
 
+    The collection uses the inner-product HNSW space: embeddings from
+    get_embedding_function() are L2-normalized, so the inner product equals
+    cosine similarity while skipping the per-comparison renormalization.
+    (Collections created before this setting keep their original space.)
+
     Returns:
         chromadb.api.models.Collection.Collection:
             A ChromaDB collection object ready for document storage and retrieval.
@@ -59,75 +197,8 @@ def get_chroma_collection(collection_name: str = "RAG_Test_files"):
     ef = get_embedding_function()
     return chroma_client.get_or_create_collection(
         name=collection_name,
-        embedding_function=ef
+        embedding_function=ef,
+        metadata={"hnsw:space": "ip"}
     )
 
 
-def split_text(text: str, chunk_size: int = 800, chunk_overlap: int = 20) -> List[str]:
-    """
-    Splits text into overlapping chunks for fine-grained retrieval.
-
-    Args:
-        text (str): The input text to split.
-        chunk_size (int, optional): Number of characters per chunk. Default is 800.
-        chunk_overlap (int, optional): Number of characters that overlap between chunks.
-                                       Default is 20.
-
-    Returns:
-        List[str]: A list of text chunks.
-    """
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        # Overlap ensures smoother semantic continuity between chunks
-        start = end - chunk_overlap
-    return chunks
-
-
-def extract_text_from_pdf(pdf_path: str):
-    """
-    Extracts text from a PDF file and structures it into metadata-rich chunks.
-
-    Each chunk is given a unique ID (SHA-1 hash) and includes metadata such as:
-    - Source filename
-    - Page number
-    - Chunk index
-    - Timestamp of ingestion
-
-    Args:
-        pdf_path (str): The absolute or relative path to the PDF file.
-
-    Returns:
-        List[dict]: A list of dictionaries, each representing a text chunk with metadata.
-    """
-    doc = fitz.open(pdf_path)
-    all_chunks = []
-    source_name = os.path.basename(pdf_path)
-
-    for page_num, page in enumerate(doc, start=1):
-        text = page.get_text("text").strip()
-        if not text:
-            continue  # Skip empty pages
-
-        # Break text into paragraph-like units for more natural segmentation
-        paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
-
-        for idx, chunk in enumerate(paragraphs):
-            chunk_id = hashlib.sha1(
-                f"{source_name}-{page_num}-{idx}-{time.time()}".encode()
-            ).hexdigest()
-
-            all_chunks.append({
-                "id": chunk_id,
-                "content": chunk,
-                "metadata": {
-                    "source": source_name,
-                    "page_number": page_num,
-                    "chunk_index": idx,
-                    "date_added": time.strftime("%Y-%m-%d %H:%M:%S"),
-                },
-            })
-
-    return all_chunks